@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 import os
 import sys
+import asyncio
 import argparse
 import subprocess
 import logging
+import logging.handlers
+import queue
+import atexit
+import functools
+import contextlib
+import shlex
 import shutil
+import signal
+import time
 
 
-from typing import Any
-from dataclasses import dataclass
+from typing import Any, Coroutine, Generator
+from pathlib import Path
+from dataclasses import dataclass, field
 
 import paho.mqtt.client as mqtt
 from paho.mqtt.client import MQTTMessage, ConnectFlags, DisconnectFlags
@@ -18,7 +28,19 @@ from paho.mqtt.properties import Properties
 
 from jsonconfig import JSONConfig
 
+_log = logging.getLogger(__name__)
+
+SCRIPT_ROOT = Path(os.path.abspath(os.path.dirname(sys.argv[0])))
+
 DEF_MQTT_SERVER = "localhost"
+MISC_LOOP_INTERVAL = 1
+RECONNECT_DELAY_MIN = 1
+RECONNECT_DELAY_MAX = 120
+DEF_COMMAND_TIMEOUT = 30
+GEOMETRY_TTL = 3600
+DEF_DEBOUNCE = 1.0
+LOG_BUFFER_SIZE = 64 * 1024
+LOG_FLUSH_INTERVAL = 1
 
 
 class ShellExecError(Exception):
@@ -39,41 +61,164 @@ class ShellExecError(Exception):
         return self.err_msg
 
 
-@dataclass
+@dataclass(slots=True)
 class MQTTTopic:
     topic: str
     payload: str
     command: str | None = None
     osd: str | None = None
+    debounce_s: float = DEF_DEBOUNCE
+    argv: list[str] = field(init=False, default_factory=list)
+    payload_bytes: bytes = field(init=False, default=b"")
+
+    def __post_init__(self) -> None:
+
+        # the topics are used as dictionary keys
+        self.topic = sys.intern(self.topic)
+
+        # msg.payload is bytes, compare it as is
+        self.payload_bytes = self.payload.encode("utf-8")
+
+        # split once here so the message path doesn't have to
+        if self.command is not None:
+            self.argv = shlex.split(self.command)
+
+
+@functools.cache
+def resolve_executable(name: str) -> str:
+
+    # subprocess only uses posix_spawn() when given a path
+    if "" != os.path.dirname(name):
+        return name
+
+    path = shutil.which(name)
 
+    if path is None:
+        # let the spawn fail the usual way
+        return name
 
-def exec_text_command(cmd_line: str, cwd: str | None = None, check: bool = True) -> tuple[int, str, str]:
+    return path
+
+
+def spawn_argv(argv: list[str]) -> list[str]:
+    return [resolve_executable(argv[0])] + argv[1:]
+
+
+def exec_text_command(argv: list[str], cwd: str | None = None, check: bool = True) -> tuple[int, str, str]:
 
     ret = 1
-    with subprocess.Popen(cmd_line,
-                          shell=True,
+
+    # no shell and close_fds=False so subprocess can use posix_spawn().
+    # Our own descriptors are all non-inheritable anyway
+    with subprocess.Popen(spawn_argv(argv),
+                          cwd=cwd,
+                          close_fds=False,
                           text=True,
                           stdout=subprocess.PIPE,
                           stderr=subprocess.PIPE) as p:
 
-        stdout, stderr = p.communicate()
+        assert p.stdout is not None
+        assert p.stderr is not None
+
+        # the outputs are small enough to fit in the pipe buffers, read
+        # them one after the other instead of going through communicate()
+        stdout = p.stdout.read()
+        stderr = p.stderr.read()
+        p.wait()
 
         if p.returncode is not None:
             ret = p.returncode
 
-        if True == check and 0 != ret:
-            raise ShellExecError(cmd_line, ret, stdout, stderr)
+        if check and 0 != ret:
+            raise ShellExecError(shlex.join(argv), ret, stdout, stderr)
 
         return ret, stdout, stderr
 
 
+def popen_lines(argv: list[str]) -> Generator[str, None, None]:
+    """
+    Yield the output of argv line by line as it comes. The process is
+    terminated if the caller stops iterating early, a failure is logged
+    otherwise
+    """
+
+    with subprocess.Popen(spawn_argv(argv),
+                          close_fds=False,
+                          text=True,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE) as p:
+
+        assert p.stdout is not None
+        assert p.stderr is not None
+
+        try:
+            yield from p.stdout
+        except GeneratorExit:
+            p.terminate()
+            raise
+
+        stderr = p.stderr.read()
+
+        ret = p.wait()
+
+        if 0 != ret:
+            _log.warning("%s", ShellExecError(shlex.join(argv), ret, "", stderr))
+
+
+async def run_cmd(argv: list[str], input: str | None = None, check: bool = True, timeout: float = DEF_COMMAND_TIMEOUT) -> tuple[int, str, str]:
+
+    # e.g. "command": "" in the config. Nothing to run, same as sh -c ""
+    if 0 == len(argv):
+        return 0, "", ""
+
+    try:
+        p = await asyncio.create_subprocess_exec(*spawn_argv(argv),
+                                                 close_fds=False,
+                                                 stdin=asyncio.subprocess.PIPE if input is not None else None,
+                                                 stdout=asyncio.subprocess.PIPE,
+                                                 stderr=asyncio.subprocess.PIPE)
+    except OSError as e:
+        # same as what the shell would have told us
+        ret, stdout, stderr = 127, "", str(e)
+    else:
+        input_bytes = input.encode("utf-8") if input is not None else None
+
+        try:
+            stdout_bytes, stderr_bytes = await asyncio.wait_for(p.communicate(input_bytes), timeout)
+            stdout = stdout_bytes.decode("utf-8", errors="replace")
+            stderr = stderr_bytes.decode("utf-8", errors="replace")
+        except asyncio.TimeoutError:
+            p.kill()
+            await p.wait()
+            stdout, stderr = "", f"timed out after {timeout}s"
+
+        ret = 1
+
+        if p.returncode is not None:
+            ret = p.returncode
+
+    if check and 0 != ret:
+        raise ShellExecError(shlex.join(argv), ret, stdout, stderr)
+
+    return ret, stdout, stderr
+
+
 class OSD:
     def __init__(self) -> None:
-        pass
+        # the desktop geometry almost never changes so only probe it once in
+        # a while ( or on SIGUSR1 ) instead of forking xrandr for every OSD
+        self.geometry: tuple[int, int] | None = None
+        self.geometry_ts = 0.0
+        self.geometry_lock = asyncio.Lock()
+
+        self.styles: dict[tuple[int, str], list[str]] = {}
+
+    def reset_geometry(self) -> None:
+        self.geometry = None
 
     def __get_geometry_dpy(self) -> tuple[int, int]:
 
-        _, stdout, _ = exec_text_command("xdpyinfo")
+        _, stdout, _ = exec_text_command(["xdpyinfo"])
 
         for line in stdout.splitlines():
 
@@ -90,64 +235,99 @@ class OSD:
 
     def __get_geometry(self) -> tuple[int, int]:
 
-        _, stdout, _ = exec_text_command("xrandr")
+        with contextlib.closing(popen_lines(["xrandr"])) as lines:
+            for line in lines:
+                if " primary " not in line:
+                    continue
+                geo_str = line.split()[3].split("+")[0]
 
-        for line in stdout.splitlines():
-            if " primary " not in line:
-                continue
-            geo_str = line.split()[3].split("+")[0]
+                w_str, h_str = geo_str.split("x")
 
-            w_str, h_str = geo_str.split("x")
-
-            return int(w_str), int(h_str)
+                return int(w_str), int(h_str)
 
         return self.__get_geometry_dpy()
 
-    def display_text(self, text: str, text_size: int = 90, text_color: str = "white") -> None:
+    async def __get_geometry_cached(self) -> tuple[int, int]:
 
-        width, height = self.__get_geometry()
+        # a burst of OSDs should only probe once
+        async with self.geometry_lock:
+
+            now = time.monotonic()
+
+            if self.geometry is None or now - self.geometry_ts > GEOMETRY_TTL:
+                # xrandr / xdpyinfo are run synchronously, keep them off the loop
+                self.geometry = await asyncio.to_thread(self.__get_geometry)
+                self.geometry_ts = now
+
+            return self.geometry
+
+    def __get_style(self, text_size: int, text_color: str) -> list[str]:
+
+        key = (text_size, text_color)
+
+        if key not in self.styles:
+            self.styles[key] = ["-R", text_color, "-n", str(text_size)]
+
+        return self.styles[key]
+
+    async def display_text(self, text: str, text_size: int = 90, text_color: str = "white") -> None:
+
+        width, height = await self.__get_geometry_cached()
 
         text_width = len(text) * text_size
 
         y = int((height / 2) - (text_size / 4))
         x = int((width / 2) - (text_width / 4))
 
-        cmd_line = f"echo \"{text}\" | aosd_cat -x {x} -y -{y} -w {text_width}"
-        cmd_line += f" -R {text_color}"
-        cmd_line += f" -n {text_size}"
+        argv = ["aosd_cat", "-x", str(x), "-y", f"-{y}", "-w", str(text_width)]
+        argv += self.__get_style(text_size, text_color)
 
-        exec_text_command(cmd_line)
+        await run_cmd(argv, input=f"{text}\n")
 
 
 class MQTTCallbacks:
 
-    def __init__(self, config: JSONConfig, verbose: bool, dry_run: bool) -> None:
+    __slots__ = ("verbose", "dry_run", "osd", "topics", "tasks", "sub_topic_list", "subscribe_arg", "last_fire", "log_fds")
+
+    def __init__(self, config: JSONConfig, verbose: bool, dry_run: bool, log_fds: tuple[int, ...] = ()) -> None:
         self.verbose = verbose
         self.dry_run = dry_run
+        self.log_fds = log_fds
 
         self.osd = OSD()
 
-        self.sub_topic_list: list[tuple[str, int]] = []
         self.topics: dict[str, MQTTTopic] = {}
 
+        # keep a reference on the in-flight handlers so they don't get
+        # garbage collected before they complete
+        self.tasks: set[asyncio.Task[None]] = set()
+
+        # monotonic time of the last accepted message, per topic
+        self.last_fire: dict[str, float] = {}
+
         for t in config.get_list("/topics", []):
             entry = MQTTTopic(**t)
 
             # make it easy to search
             self.topics[entry.topic] = entry
-            self.sub_topic_list.append((entry.topic, 0))
 
-    def __parse_topic_command(self, topic: MQTTTopic) -> None:
+        self.sub_topic_list: tuple[tuple[str, int], ...] = tuple((t, 0) for t in self.topics)
+
+        # what gets handed to subscribe() on every (re)connect. paho only
+        # reads it
+        self.subscribe_arg = list(self.sub_topic_list)
+
+    async def __parse_topic_command(self, topic: MQTTTopic) -> None:
 
         if topic.command is None:
             return
 
-        logging.info(f"executing \"{topic.command}\"")
+        _log.info("executing \"%s\"", topic.command)
 
-        if True == self.dry_run:
+        if self.dry_run:
             return
 
-        ret, stdout, stderr = exec_text_command(topic.command, check=False)
+        ret, stdout, stderr = await run_cmd(topic.argv, check=False)
 
         if 0 != ret:
             err_msg = f"{topic.command} returned {ret}"
@@ -157,98 +337,375 @@ class MQTTCallbacks:
 
             if "" != stderr:
                 err_msg += f"\n{stderr}"
-            logging.error(err_msg)
+            _log.error(err_msg)
 
-    def __parse_topic_osd(self, topic: MQTTTopic) -> None:
+    async def __parse_topic_osd(self, topic: MQTTTopic) -> None:
 
         if topic.osd is None:
             return
 
-        logging.info(f"displaying \"{topic.osd}\"")
+        _log.info("displaying \"%s\"", topic.osd)
+
+        try:
+            await self.osd.display_text(topic.osd)
+        except ShellExecError as e:
+            _log.error("%s", e)
 
-        self.osd.display_text(topic.osd)
+    async def __parse_topic(self, topic: MQTTTopic) -> None:
 
-    def __parse_topic(self, topic: MQTTTopic) -> None:
+        # aosd_cat only returns once the text is gone from the screen, let
+        # it run on its own
+        if topic.osd is not None:
+            self.__create_task(self.__parse_topic_osd(topic))
 
         try:
             if topic.command is not None:
-                self.__parse_topic_command(topic)
-
-            if topic.osd is not None:
-                self.__parse_topic_osd(topic)
+                await self.__parse_topic_command(topic)
         except ShellExecError as e:
-            logging.error(str(e))
+            _log.error("%s", e)
+
+    def __create_task(self, coro: Coroutine[Any, Any, None]) -> None:
+
+        # called from loop_read() so we're always on the event loop thread
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.__on_task_done)
+
+    def __on_task_done(self, task: asyncio.Task[None]) -> None:
+
+        self.tasks.discard(task)
+
+        if task.cancelled():
+            return
+
+        # retrieve it here, otherwise asyncio only complains once the task
+        # is garbage collected
+        e = task.exception()
+
+        if e is not None:
+            _log.error("handler failed. error=%s", e, exc_info=e)
 
     def on_connect(self, client: mqtt.Client, userdata: Any, connect_flags: ConnectFlags, reason_code: ReasonCode, properties: Properties | None) -> None:
-        logging.info(f"connected. reason={reason_code}")
+        _log.info("connected. reason=%s", reason_code)
 
-        if 0 == reason_code.value and len(self.sub_topic_list) > 0:
-            client.subscribe(self.sub_topic_list)
+        if 0 == reason_code.value and self.subscribe_arg:
+            client.subscribe(self.subscribe_arg)
 
     def on_disconnect(self, client: mqtt.Client, userdata: Any, disconnect_flags: DisconnectFlags, reason_code: ReasonCode, props: Properties | None) -> None:
-        logging.info(f"disconnected. reason={reason_code}")
+        _log.info("disconnected. reason=%s", reason_code)
 
     def on_log(self, client: mqtt.Client, userdata: Any, reason_code: int, log: str) -> None:
 
-        if True == self.verbose:
-            logging.info(log)
+        if not self.verbose:
+            return
+
+        # one line per packet, skip the logging machinery and write the
+        # same format LogFormatter produces straight to the descriptors
+        line = f"{time.time():<18.6f} - INFO - {log}\n".encode("utf-8", errors="replace")
+
+        for fd in self.log_fds:
+            os.write(fd, line)
 
     def on_message(self, client: mqtt.Client, userdata: str, msg: MQTTMessage) -> None:
+        # only reached for topics without a per-topic callback
+        _log.warning("ignoring %s", msg.topic)
+
+    def __dispatch(self, entry: MQTTTopic, client: mqtt.Client, userdata: Any, msg: MQTTMessage) -> None:
 
-        payload = msg.payload.decode("utf-8")
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug("%s -> %s", msg.topic, msg.payload.decode("utf-8", errors="replace"))
 
-        logging.debug(f"{msg.topic} -> {payload}")
+        if msg.payload != entry.payload_bytes:
+            _log.warning("payload not handled. payload=\"%s\"", msg.payload.decode("utf-8", errors="replace"))
+            return
+
+        # sensors tend to chatter, only act on the first of a burst
+        now = time.monotonic()
 
-        if msg.topic not in self.topics:
-            logging.warning(f"ignoring {msg.topic}")
+        if now - self.last_fire.get(entry.topic, -entry.debounce_s) < entry.debounce_s:
+            _log.debug("debouncing %s", entry.topic)
             return
 
-        entry = self.topics[msg.topic]
+        self.last_fire[entry.topic] = now
+
+        self.__create_task(self.__parse_topic(entry))
+
+    def register(self, client: mqtt.Client) -> None:
+
+        client.on_message = self.on_message
+        client.on_connect = self.on_connect
+        client.on_disconnect = self.on_disconnect
+
+        # paho formats every log line before handing it to on_log
+        if self.verbose:
+            client.on_log = self.on_log
+
+        # let paho route the messages straight to the right topic
+        for topic, entry in self.topics.items():
+            client.message_callback_add(topic, functools.partial(self.__dispatch, entry))
+
+
+class AsyncPahoClient:
+    """
+    Drive the paho network loop from asyncio instead of loop_forever()
+    """
+
+    def __init__(self, client: mqtt.Client) -> None:
+        self.client = client
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.misc: asyncio.TimerHandle | None = None
+        self.disconnected = asyncio.Event()
 
-        if payload == entry.payload:
-            self.__parse_topic(entry)
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def __loop_misc(self) -> None:
+
+        assert self.loop is not None
+
+        if mqtt.MQTT_ERR_SUCCESS == self.client.loop_misc():
+            self.misc = self.loop.call_later(MISC_LOOP_INTERVAL, self.__loop_misc)
         else:
-            logging.warning(f"payload not handled. payload=\"{payload}\"")
+            self.misc = None
+
+    def on_socket_open(self, client: mqtt.Client, userdata: Any, sock: Any) -> None:
+
+        assert self.loop is not None
+
+        self.loop.add_reader(sock, client.loop_read)
+        self.misc = self.loop.call_later(MISC_LOOP_INTERVAL, self.__loop_misc)
+
+    def on_socket_close(self, client: mqtt.Client, userdata: Any, sock: Any) -> None:
+
+        assert self.loop is not None
+
+        self.loop.remove_reader(sock)
+
+        if self.misc is not None:
+            self.misc.cancel()
+            self.misc = None
+
+        self.disconnected.set()
+
+    def on_socket_register_write(self, client: mqtt.Client, userdata: Any, sock: Any) -> None:
+
+        assert self.loop is not None
+
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client: mqtt.Client, userdata: Any, sock: Any) -> None:
+
+        assert self.loop is not None
+
+        self.loop.remove_writer(sock)
+
+    async def __reconnect(self) -> None:
+
+        delay = RECONNECT_DELAY_MIN
+
+        while True:
+            await asyncio.sleep(delay)
+
+            try:
+                self.client.reconnect()
+                return
+            except OSError as e:
+                _log.warning("reconnect failed. error=%s", e)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+    async def loop_forever(self, host: str, port: int, keepalive: int) -> None:
+
+        self.loop = asyncio.get_running_loop()
+
+        # stop on SIGTERM the same way as on Ctrl-C, so we disconnect and the
+        # atexit hooks get to flush the logs
+        task = asyncio.current_task()
+        assert task is not None
+        self.loop.add_signal_handler(signal.SIGTERM, task.cancel)
+
+        self.client.connect(host,
+                            port=port,
+                            keepalive=keepalive)
+        try:
+            while True:
+                await self.disconnected.wait()
+                self.disconnected.clear()
+                await self.__reconnect()
+        except asyncio.CancelledError:
+            self.client.disconnect()
+            raise
+        finally:
+            self.loop.remove_signal_handler(signal.SIGTERM)
+
+
+class LogFormatter(logging.Formatter):
+    """
+    Same output as '%(created)-18s - %(levelname)s - %(message)s' without
+    going through the generic %-style machinery
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+
+        line = f"{record.created:<18.6f} - {record.levelname} - {record.getMessage()}"
 
+        # same as logging.Formatter.format()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
 
-def init_logging(verbose: bool, file_name: str = "logs.log"):
+        if record.exc_text:
+            line += f"\n{record.exc_text}"
 
-    script_root = os.path.abspath(os.path.dirname(sys.argv[0]))
-    log_file = os.path.join(script_root, file_name)
+        if record.stack_info:
+            line += f"\n{self.formatStack(record.stack_info)}"
 
-    formatter = logging.Formatter(
-        '%(created)-18s - %(levelname)s - %(message)s')
+        return line
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler that doesn't flush after every record. See
+    FlushingQueueListener
+    """
+
+    def _open(self) -> Any:
+        return open(self.baseFilename,
+                    self.mode,
+                    buffering=LOG_BUFFER_SIZE,
+                    encoding=self.encoding,
+                    errors=self.errors)
+
+    def emit(self, record: logging.LogRecord) -> None:
+
+        if self.stream is None:
+            self.stream = self._open()
+
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    Flush the handlers at most LOG_FLUSH_INTERVAL seconds after the first
+    unflushed record, from the listener thread
+    """
+
+    def __init__(self, q: queue.Queue[logging.LogRecord], *handlers: logging.Handler, respect_handler_level: bool = False) -> None:
+        super().__init__(q, *handlers, respect_handler_level=respect_handler_level)
+        # self.queue is only typed as something with get(block)
+        self.log_queue = q
+        self.deadline: float | None = None
+
+    def __flush(self) -> None:
+
+        self.deadline = None
+
+        for h in self.handlers:
+            h.flush()
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+
+        while True:
+            timeout = None
+
+            if self.deadline is not None:
+                timeout = self.deadline - time.monotonic()
+
+                if timeout <= 0:
+                    self.__flush()
+                    continue
+
+            try:
+                record = self.log_queue.get(block, timeout)
+            except queue.Empty:
+                if not block:
+                    raise
+                continue
+
+            if self.deadline is None:
+                self.deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+
+            return record
+
+
+def init_logging(verbose: bool, file_name: str = "logs.log") -> tuple[int, ...]:
+
+    log_file = SCRIPT_ROOT / file_name
+
+    formatter = LogFormatter()
 
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
 
-    file_handler = logging.FileHandler(log_file)
+    handlers: list[logging.Handler] = []
+
+    # no RotatingFileHandler on purpose, it stat()s the file on every
+    # record. Rotation is left to logrotate ( copytruncate ) so an emit
+    # stays a single buffered write
+    file_handler = BufferedFileHandler(log_file)
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    handlers.append(file_handler)
 
     if verbose:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
+    # the callbacks only enqueue the records, the actual I/O happens on the
+    # listener thread
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
-def check_requirements() -> None:
+    listener = FlushingQueueListener(log_queue,
+                                     *handlers,
+                                     respect_handler_level=True)
+    listener.start()
+
+    atexit.register(listener.stop)
+
+    if not verbose:
+        return ()
+
+    # raw descriptors for the paho packet log, see MQTTCallbacks.on_log()
+    log_fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    atexit.register(os.close, log_fd)
 
-    avail = True
+    return log_fd, sys.stderr.fileno()
+
+
+def check_requirements() -> None:
 
     shell_commands = ["xrandr", "aosd_cat", "xdpyinfo"]
 
-    for c in shell_commands:
+    wanted = set(shell_commands)
+    found: set[str] = set()
+
+    # one listdir() per PATH entry instead of a which() per command
+    for d in os.environ.get("PATH", os.defpath).split(os.pathsep):
+
+        try:
+            names = wanted.intersection(os.listdir(d or "."))
+        except OSError:
+            continue
+
+        for n in names:
+            path = os.path.join(d, n)
+
+            # same test as shutil.which(), X_OK alone accepts directories
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                found.add(n)
 
-        path = shutil.which(c)
+    missing = [c for c in shell_commands if c not in found]
 
-        if path is None:
-            print(f"ERROR: \"{c}\" command was not found in path")
-            avail = False
+    for c in missing:
+        print(f"ERROR: \"{c}\" command was not found in path")
 
-    assert True == avail, "Missing requirements"
+    assert 0 == len(missing), "Missing requirements"
 
 
 def main() -> int:
@@ -257,8 +714,7 @@ def main() -> int:
 
     parser = argparse.ArgumentParser()
 
-    script_root = os.path.abspath(os.path.dirname(sys.argv[0]))
-    def_config_file = os.path.join(script_root, "config.json")
+    def_config_file = str(SCRIPT_ROOT / "config.json")
 
     parser.add_argument("-c",
                         "--config",
@@ -285,27 +741,30 @@ def main() -> int:
         host = config.get_str("/server/host")  # mandatory
         keepalive = config.get_int("/server/keep_alive", 10)
         port = config.get_int("/server/port", 1883)
+        max_inflight = config.get_int("/server/max_inflight", 20)
+        max_queued = config.get_int("/server/max_queued", 0)
 
-        init_logging(args.verbose)
+        log_fds = init_logging(args.verbose)
 
-        logging.info("=" * 80)
+        _log.info("=" * 80)
 
-        cb = MQTTCallbacks(config, args.verbose, args.dry_run)
+        cb = MQTTCallbacks(config, args.verbose, args.dry_run, log_fds)
+
+        # kill -USR1 after a resolution change
+        signal.signal(signal.SIGUSR1, lambda signum, frame: cb.osd.reset_geometry())
 
         client = mqtt.Client(CallbackAPIVersion.VERSION2)
-        client.connect(host,
-                       port=port,
-                       keepalive=keepalive)
-        client.on_message = cb.on_message
-        client.on_connect = cb.on_connect
-        client.on_disconnect = cb.on_disconnect
-        client.on_log = cb.on_log
+        client.max_inflight_messages_set(max_inflight)
+        client.max_queued_messages_set(max_queued)
+        cb.register(client)
+
+        async_client = AsyncPahoClient(client)
 
-        client.loop_forever()
+        asyncio.run(async_client.loop_forever(host, port, keepalive))
 
         status = 0
 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         pass
     except AssertionError:
         pass